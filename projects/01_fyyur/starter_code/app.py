@@ -13,8 +13,12 @@ from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
 from flask_migrate import Migrate
+from flask_caching import Cache
 import sys
-from datetime import date
+import itertools
+from operator import attrgetter
+from datetime import date, datetime, time
+from sqlalchemy.orm import joinedload, deferred, undefer_group, raiseload
 
 # ----------------------------------------------------------------------------#
 # App Config.
@@ -25,6 +29,13 @@ moment = Moment(app)
 app.config.from_object('config')
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
+cache = Cache(app)
+
+if app.config['NPLUSONE_ENABLED']:
+    # fail loudly in development when a lazy load turns into an N+1 query
+    from nplusone.ext.flask_sqlalchemy import NPlusOne
+    app.config['NPLUSONE_RAISE'] = True
+    NPlusOne(app)
 
 
 # DONE: connect to a local postgresql database
@@ -35,6 +46,10 @@ migrate = Migrate(app, db)
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    # trigram index so the ILIKE '%term%' search can use an index scan
+    __table_args__ = (
+        db.Index('venue_name_trgm_idx', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -42,44 +57,54 @@ class Venue(db.Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    image_link = db.Column(db.String(500))
+    image_link = deferred(db.Column(db.String(500)), group='profile')
     facebook_link = db.Column(db.String(120))
 
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
     website = db.Column(db.String(300))
     genres = db.Column(db.ARRAY(db.String(120)))
     seeking_talent = db.Column(db.Boolean)
-    seeking_description = db.Column(db.Text)
-    show = db.relationship('Show', backref='Venue')
+    seeking_description = deferred(db.Column(db.Text), group='profile')
+    shows = db.relationship('Show', back_populates='venue', passive_deletes=True)
 
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('artist_name_trgm_idx', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
-    image_link = db.Column(db.String(500))
+    genres = db.Column(db.ARRAY(db.String(120)))
+    image_link = deferred(db.Column(db.String(500)), group='profile')
     facebook_link = db.Column(db.String(120))
 
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
     website = db.Column(db.String(300))
     seeking_venue = db.Column(db.Boolean)
-    seeking_description = db.Column(db.Text)
-    show = db.relationship('Show', backref='Artist')
+    seeking_description = deferred(db.Column(db.Text), group='profile')
+    shows = db.relationship('Show', back_populates='artist', passive_deletes=True)
 
 
 # DONE Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_show_start_time', 'start_time'),
+        db.Index('ix_show_venue_start', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_start', 'artist_id', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+    venue = db.relationship('Venue', back_populates='shows')
+    artist = db.relationship('Artist', back_populates='shows')
 
 
 # ----------------------------------------------------------------------------#
@@ -98,6 +123,17 @@ def format_datetime(value, format='medium'):
 app.jinja_env.filters['datetime'] = format_datetime
 
 
+# ----------------------------------------------------------------------------#
+# Cache.
+# ----------------------------------------------------------------------------#
+
+def clear_listing_cache():
+    # drop the cached /venues, /artists and /shows pages after any write,
+    # one by one since delete_many stops at the first key that isn't cached
+    for key in ('venues', 'artists', 'shows'):
+        cache.delete(key)
+
+
 # ----------------------------------------------------------------------------#
 # Controllers.
 # ----------------------------------------------------------------------------#
@@ -111,40 +147,38 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@cache.cached(key_prefix='venues')
 def venues():
     # Done: replace with real venues data.
     # DONE: num_shows should be aggregated based on number of upcoming shows per venue.
-    all_venues = Venue.query.all()
+    all_venues = db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        db.func.count(Show.id).filter(Show.start_time >= date.today()).label('num_upcoming_shows')
+    ).outerjoin(Show, Show.venue_id == Venue.id).group_by(Venue.id).order_by(Venue.city, Venue.state).all()
     data = []
-    places = set([])
-    for venue in all_venues:
-        places.add((venue.city, venue.state))
-    for place in places:
-        related_venues = []
-        related_venues_list = list(filter(
-            lambda current_venue: current_venue.city == place[0] and current_venue.state == place[1],
-            all_venues))
-        for related_venue in related_venues_list:
-            num_upcoming_shows = 0
-            for show in related_venue.show:
-                if show.start_time.date() >= date.today():
-                    num_upcoming_shows += 1
-            related_venues.append({
-                'id': related_venue.id,
-                'name': related_venue.name,
-                'num_upcoming_shows': num_upcoming_shows,
-            })
-        place_venues = {'city': place[0], 'state': place[1],
-                        'venues': related_venues}
-        data.append(place_venues)
+    for (city, state), related_venues in itertools.groupby(all_venues, key=attrgetter('city', 'state')):
+        data.append({
+            'city': city,
+            'state': state,
+            'venues': [{
+                'id': venue.id,
+                'name': venue.name,
+                'num_upcoming_shows': venue.num_upcoming_shows,
+            } for venue in related_venues]
+        })
     return render_template('pages/venues.html', areas=data)
 
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
     # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
-    search_by = request.form['search_term']
-    matched_venues = Venue.query.filter(Venue.name.ilike(f'%{search_by}%')).all()
+    search_by = request.form.get('search_term', '').strip()
+    if not search_by:
+        return render_template('pages/search_venues.html', results={'count': 0, 'data': []}, search_term='')
+    matched_venues = db.session.query(Venue.id, Venue.name).filter(Venue.name.ilike(f'%{search_by}%')).all()
     count = len(matched_venues)
     # seach for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
@@ -166,22 +200,24 @@ def search_venues():
 @app.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
     # DONE: shows the venue page with the given venue_id
-    venue = Venue.query.get(venue_id)
+    venue = Venue.query.options(undefer_group('profile')).get(venue_id)
     if venue is None:
         return render_template('errors/404.html')
-    upcoming_shows = []
-    past_shows = []
-    for show in venue.show:
-        item = {
+
+    def show_item(show):
+        return {
             'artist_id': show.artist_id,
-            'artist_name': show.Artist.name,
-            'artist_image_link': show.Artist.image_link,
+            'artist_name': show.artist.name,
+            'artist_image_link': show.artist.image_link,
             'start_time': str(show.start_time)
         }
-        if show.start_time.date() >= date.today():
-            upcoming_shows.append(item)
-        else:
-            past_shows.append(item)
+
+    today = datetime.combine(date.today(), time.min)
+    venue_shows = Show.query.options(joinedload(Show.artist).undefer('image_link')).filter(Show.venue_id == venue_id)
+    upcoming_shows = [show_item(show) for show in
+                      venue_shows.filter(Show.start_time >= today).order_by(Show.start_time).all()]
+    past_shows = [show_item(show) for show in
+                  venue_shows.filter(Show.start_time < today).order_by(Show.start_time).all()]
     # DONE: replace with real venue data from the venues table, using venue_id
     data = {
         "id": venue.id,
@@ -211,7 +247,8 @@ def show_venue(venue_id):
 @app.route('/venues/create', methods=['GET'])
 def create_venue_form():
     form = VenueForm()
-    return render_template('forms/new_venue.html', form=form)
+    return render_template('forms/new_venue.html', form=form,
+                           state_options_html=STATE_OPTIONS_HTML, genre_options_html=GENRE_OPTIONS_HTML)
 
 
 @app.route('/venues/create', methods=['POST'])
@@ -233,11 +270,12 @@ def create_venue_submission():
             seeking_talent = True if 'seeking_talent' in request.form else False
             seeking_description = request.form['seeking_description']
             # DONE: modify data to be the data object returned from db insertion
-            venue = Venue(name=name, city=city, state=state, address=address, phone=phone, image_link=image_link,
-                          facebook_link=facebook_link, website=website, genres=genres, seeking_talent=seeking_talent,
-                          seeking_description=seeking_description)
-            db.session.add(venue)
+            db.session.execute(db.insert(Venue).values(
+                name=name, city=city, state=state, address=address, phone=phone, image_link=image_link,
+                facebook_link=facebook_link, website=website, genres=genres, seeking_talent=seeking_talent,
+                seeking_description=seeking_description))
             db.session.commit()
+            clear_listing_cache()
         else:
             error = True
     except:
@@ -262,9 +300,10 @@ def delete_venue(venue_id):
     # DONE: Complete this endpoint for taking a venue_id, and using
     # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
     try:
-        venue = Venue.query.get(venue_id)
-        db.session.delete(venue)
+        # shows are removed by the ON DELETE CASCADE foreign key
+        Venue.query.filter_by(id=venue_id).delete(synchronize_session=False)
         db.session.commit()
+        clear_listing_cache()
     except:
         db.session.rollback()
     finally:
@@ -279,21 +318,24 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@cache.cached(key_prefix='artists')
 def artists():
     # DONE: replace with real data returned from querying the database
-    data = Artist.query.all()
+    data = Artist.query.options(raiseload('*')).all()
     return render_template('pages/artists.html', artists=data)
 
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
     # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
-    search_by = request.form['search_term']
-    matched_artists = Artist.query.filter(Artist.name.ilike(f'%{search_by}%')).all()
+    search_by = request.form.get('search_term', '').strip()
+    if not search_by:
+        return render_template('pages/search_artists.html', results={'count': 0, 'data': []}, search_term='')
+    matched_artists = db.session.query(Artist.id, Artist.name).filter(Artist.name.ilike(f'%{search_by}%')).all()
     count = len(matched_artists)
 
     response = {
-        "count": len(matched_artists),
+        "count": count,
         "data": []
     }
     if count > 0:
@@ -313,26 +355,28 @@ def search_artists():
 def show_artist(artist_id):
     # shows the artist page with the given venue_id
     # DONE: replace with real artist data from the artists table, using artist_id
-    artist = Artist.query.get(artist_id)
+    artist = Artist.query.options(undefer_group('profile')).get(artist_id)
     if artist is None:
         return render_template('errors/404.html')
-    upcoming_shows = []
-    past_shows = []
-    for show in artist.show:
-        item = {
+
+    def show_item(show):
+        return {
             'venue_id': show.venue_id,
-            'venue_name': show.Venue.name,
-            'venue_image_link': show.Venue.image_link,
+            'venue_name': show.venue.name,
+            'venue_image_link': show.venue.image_link,
             'start_time': str(show.start_time)
         }
-        if show.start_time.date() >= date.today():
-            upcoming_shows.append(item)
-        else:
-            past_shows.append(item)
+
+    today = datetime.combine(date.today(), time.min)
+    artist_shows = Show.query.options(joinedload(Show.venue).undefer('image_link')).filter(Show.artist_id == artist_id)
+    upcoming_shows = [show_item(show) for show in
+                      artist_shows.filter(Show.start_time >= today).order_by(Show.start_time).all()]
+    past_shows = [show_item(show) for show in
+                  artist_shows.filter(Show.start_time < today).order_by(Show.start_time).all()]
     data = {
         "id": artist.id,
         "name": artist.name,
-        "genres": artist.genres.split(','),
+        "genres": artist.genres,
         "city": artist.city,
         "state": artist.state,
         "phone": artist.phone,
@@ -355,7 +399,7 @@ def show_artist(artist_id):
 def edit_artist(artist_id):
     # DONE: populate form with fields from artist with ID <artist_id>
     form = ArtistForm()
-    artist = Artist.query.get(artist_id)
+    artist = Artist.query.options(undefer_group('profile')).get(artist_id)
     if artist is None:
         return render_template('errors/404.html')
     form.name.data = artist.name
@@ -376,10 +420,12 @@ def edit_artist_submission(artist_id):
     # DONE: take values from the form submitted, and update existing
     # artist record with ID <artist_id> using the new attributes
     error = False
-    artist = Artist.query.get(artist_id)
     form = ArtistForm()
     try:
         if form.validate_on_submit():
+            artist = Artist.query.get(artist_id)
+            if artist is None:
+                return render_template('errors/404.html')
             artist.name = request.form['name']
             artist.city = request.form['city']
             artist.state = request.form['state']
@@ -391,6 +437,7 @@ def edit_artist_submission(artist_id):
             artist.seeking_venue = True if 'seeking_venue' in request.form else False
             artist.seeking_description = request.form['seeking_description']
             db.session.commit()
+            clear_listing_cache()
         else:
             error = True
     except:
@@ -407,7 +454,7 @@ def edit_artist_submission(artist_id):
 def edit_venue(venue_id):
     form = VenueForm()
     # DONE: populate form with values from venue with ID <venue_id>
-    venue = Venue.query.get(venue_id)
+    venue = Venue.query.options(undefer_group('profile')).get(venue_id)
     if venue is None:
         return render_template('errors/404.html')
     form.name.data = venue.name
@@ -429,10 +476,12 @@ def edit_venue(venue_id):
 def edit_venue_submission(venue_id):
     # Done: take values from the form submitted, and update existing
     error = False
-    venue = Venue.query.get(venue_id)
     form = VenueForm()
     try:
         if form.validate_on_submit():
+            venue = Venue.query.get(venue_id)
+            if venue is None:
+                return render_template('errors/404.html')
             venue.name = request.form['name']
             venue.city = request.form['city']
             venue.state = request.form['state']
@@ -445,6 +494,7 @@ def edit_venue_submission(venue_id):
             venue.seeking_talent = True if 'seeking_talent' in request.form else False
             venue.seeking_description = request.form['seeking_description']
             db.session.commit()
+            clear_listing_cache()
         else:
             error = True
     except:
@@ -463,7 +513,8 @@ def edit_venue_submission(venue_id):
 @app.route('/artists/create', methods=['GET'])
 def create_artist_form():
     form = ArtistForm()
-    return render_template('forms/new_artist.html', form=form)
+    return render_template('forms/new_artist.html', form=form,
+                           state_options_html=STATE_OPTIONS_HTML, genre_options_html=GENRE_OPTIONS_HTML)
 
 
 @app.route('/artists/create', methods=['POST'])
@@ -485,11 +536,12 @@ def create_artist_submission():
             seeking_venue = True if 'seeking_venue' in request.form else False
             seeking_description = request.form['seeking_description']
             # DONE: modify data to be the data object returned from db insertion
-            artist = Artist(name=name, city=city, state=state, phone=phone, image_link=image_link,
-                            facebook_link=facebook_link, website=website, genres=genres, seeking_venue=seeking_venue,
-                            seeking_description=seeking_description)
-            db.session.add(artist)
+            db.session.execute(db.insert(Artist).values(
+                name=name, city=city, state=state, phone=phone, image_link=image_link,
+                facebook_link=facebook_link, website=website, genres=genres, seeking_venue=seeking_venue,
+                seeking_description=seeking_description))
             db.session.commit()
+            clear_listing_cache()
         else:
             error = True
     except:
@@ -513,19 +565,28 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@cache.cached(key_prefix='shows')
 def shows():
     # displays list of shows at /shows
     # DONE: replace with real shows data.
     #       num_shows should be aggregated based on number of upcoming shows per venue.
-    num_shows = Show.query.filter(Show.start_time >= date.today()).order_by(db.asc(Show.start_time))
+    upcoming_shows = db.session.query(
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id) \
+        .filter(Show.start_time >= date.today()).order_by(db.asc(Show.start_time)).all()
     data = []
-    for show in num_shows:
+    for show in upcoming_shows:
         data.append({
-            "venue_id": show.Venue.id,
-            "venue_name": show.Venue.name,
-            "artist_id": show.Artist.id,
-            "artist_name": show.Artist.name,
-            "artist_image_link": show.Artist.image_link,
+            "venue_id": show.venue_id,
+            "venue_name": show.venue_name,
+            "artist_id": show.artist_id,
+            "artist_name": show.artist_name,
+            "artist_image_link": show.artist_image_link,
             "start_time": str(show.start_time)
         })
 
@@ -550,9 +611,9 @@ def create_show_submission():
             artist_id = int(request.form['artist_id'])
             venue_id = int(request.form['venue_id'])
             start_time = request.form['start_time']
-            show = Show(artist_id=artist_id, venue_id=venue_id, start_time=start_time)
-            db.session.add(show)
+            db.session.execute(db.insert(Show).values(artist_id=artist_id, venue_id=venue_id, start_time=start_time))
             db.session.commit()
+            clear_listing_cache()
         else:
             error = True
     except:
@@ -6,9 +6,23 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 # Enable debug mode.
 DEBUG = True
 
+# Raise on N+1 lazy loads, needs the packages from requirements-dev.txt
+NPLUSONE_ENABLED = os.environ.get('NPLUSONE_ENABLED') == '1'
+
 # Connect to the database
 
 
 # DONE IMPLEMENT DATABASE URL
 SQLALCHEMY_DATABASE_URI = 'postgresql://baraa:  @localhost:5432/fyyur'
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': 20,
+    'max_overflow': 10,
+    # test connections on checkout and recycle them so a Postgres restart doesn't surface as errors
+    'pool_pre_ping': True,
+    'pool_recycle': 1800,
+}
+
+# Cache the read-mostly listing pages (use RedisCache in production)
+CACHE_TYPE = 'SimpleCache'
+CACHE_DEFAULT_TIMEOUT = 60
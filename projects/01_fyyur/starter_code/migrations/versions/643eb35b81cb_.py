@@ -0,0 +1,36 @@
+"""store Artist.genres as an array like Venue.genres
+
+Revision ID: 643eb35b81cb
+Revises: faafb05cd727
+Create Date: 2026-10-14 11:03:52.640127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '643eb35b81cb'
+down_revision = 'faafb05cd727'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # rows written from the form already hold an array literal ('{Jazz,"Rock n Roll"}'),
+    # older rows hold a comma separated list
+    # the DDL goes through the DBAPI paramstyle, so the LIKE wildcard is written as %%
+    op.alter_column('Artist', 'genres',
+               existing_type=sa.VARCHAR(length=120),
+               type_=sa.ARRAY(sa.String(length=120)),
+               existing_nullable=True,
+               postgresql_using="CASE WHEN genres LIKE '{%%}' THEN genres::varchar(120)[] "
+                                "ELSE string_to_array(genres, ',') END")
+
+
+def downgrade():
+    op.alter_column('Artist', 'genres',
+               existing_type=sa.ARRAY(sa.String(length=120)),
+               type_=sa.VARCHAR(length=120),
+               existing_nullable=True,
+               postgresql_using="array_to_string(genres, ',')")
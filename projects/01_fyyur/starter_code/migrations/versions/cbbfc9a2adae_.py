@@ -0,0 +1,28 @@
+"""index Show.start_time and the per venue/artist show lookups
+
+Revision ID: cbbfc9a2adae
+Revises: 643eb35b81cb
+Create Date: 2026-10-14 11:27:44.905213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cbbfc9a2adae'
+down_revision = '643eb35b81cb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_start_time', 'Show', ['start_time'], unique=False)
+    op.create_index('ix_show_venue_start', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_artist_start', 'Show', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_show_artist_start', table_name='Show')
+    op.drop_index('ix_show_venue_start', table_name='Show')
+    op.drop_index('ix_show_start_time', table_name='Show')
@@ -0,0 +1,29 @@
+"""add trigram indexes on Venue.name and Artist.name
+
+Revision ID: fa6acbebadf9
+Revises: 92ece97e4e1e
+Create Date: 2026-10-14 10:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fa6acbebadf9'
+down_revision = '92ece97e4e1e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('venue_name_trgm_idx', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('artist_name_trgm_idx', 'Artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('artist_name_trgm_idx', table_name='Artist')
+    op.drop_index('venue_name_trgm_idx', table_name='Venue')
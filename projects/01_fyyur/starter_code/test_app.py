@@ -0,0 +1,28 @@
+import unittest
+
+from app import app, cache, clear_listing_cache
+
+
+class ListingCacheTestCase(unittest.TestCase):
+    """This class represents the listing cache test case"""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+        self.ctx.pop()
+
+    def test_clear_listing_cache_uncached_keys(self):
+        # only /shows is cached, the other keys must not stop the clear
+        cache.set('shows', 'stale')
+        clear_listing_cache()
+
+        self.assertIsNone(cache.get('shows'))
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
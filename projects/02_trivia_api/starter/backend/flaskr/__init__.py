@@ -1,28 +1,148 @@
 import os
-from flask import Flask, request, abort, jsonify
+from flask import Flask, Response, request, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+import hashlib
 import random
-from sqlalchemy import not_, func
-from models import setup_db, Question, Category
+import orjson
+import time
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from models import setup_db, db, Question, Category
 
 QUESTIONS_PER_PAGE = 10
+QUESTION_COLUMNS = (Question.id, Question.question, Question.answer,
+                    Question.category, Question.difficulty)
+CORS_HEADERS = (
+    ('Access-Control-Allow-Headers', 'Content-Type,Authorization,true'),
+    ('Access-Control-Allow-Credentials', 'true'),
+    ('Access-Control-Allow-Methods', 'GET,PATCH,POST,DELETE,OPTIONS')
+)
+CATEGORIES_CACHE_TTL = 60
+QUESTION_COUNT_CACHE_TTL = 30
+QUIZ_IDS_CACHE_TTL = 60
+
+
+class TTLCache:
+    '''
+    TTLCache(ttl)
+        in-process cache whose entries are reloaded ttl seconds after they were stored
+    '''
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key, load):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or now - entry[1] > self.ttl:
+            entry = (load(), now)
+            self._entries[key] = entry
+
+        return entry[0]
+
+    def clear(self):
+        self._entries.clear()
+
+
+_categories_cache = TTLCache(CATEGORIES_CACHE_TTL)
+# keyed by category id, None holds the count of all questions
+_question_count_cache = TTLCache(QUESTION_COUNT_CACHE_TTL)
+# keyed by quiz category id, 0 holds every question
+_quiz_ids_cache = TTLCache(QUIZ_IDS_CACHE_TTL)
+
+
+def _load_categories():
+    categories = dict(db.session.query(
+        Category.id, Category.type).order_by(Category.id).all())
+    etag = hashlib.sha1(repr(sorted(
+        categories.items())).encode('utf-8')).hexdigest()
+
+    return categories, etag
+
+
+def _get_categories_cached():
+    return _categories_cache.get(None, _load_categories)[0]
+
+
+def _get_categories_etag():
+    return _categories_cache.get(None, _load_categories)[1]
+
+
+def _clear_categories_cache():
+    _categories_cache.clear()
+
+
+def _get_question_count_cached(category=None):
+    def count_questions():
+        count_query = db.session.query(func.count(Question.id))
+        if category is not None:
+            count_query = count_query.filter(Question.category == category)
+
+        return count_query.scalar()
+
+    return _question_count_cache.get(category, count_questions)
+
+
+def _clear_question_count_cache():
+    _question_count_cache.clear()
+
+
+def _get_quiz_ids_cached(category):
+    def load_ids():
+        ids_query = db.session.query(Question.id)
+        if category != 0:
+            ids_query = ids_query.filter(Question.category == category)
+
+        return [question_id for (question_id,) in ids_query.all()]
+
+    return _quiz_ids_cache.get(category, load_ids)
+
+
+def _clear_quiz_ids_cache():
+    _quiz_ids_cache.clear()
+
 
+def parse_int(value):
+    # int() would truncate 2.7 to 2 and turn true into 1, only accept
+    # real integers and digit strings
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
+    return None
 
-def get_paginated_questions(request, questions, num_of_questions):
-    page = request.args.get('page', 1, type=int)
-    start = (page - 1) * num_of_questions
-    end = start + num_of_questions
 
-    questions = [question.format() for question in questions]
-    current_questions = questions[start:end]
+def json_response(payload, status=200):
+    # category maps are keyed by integer id, which orjson only accepts with OPT_NON_STR_KEYS
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS),
+        status=status, mimetype='application/json')
 
-    return current_questions
+
+def get_paginated_questions(questions, page, per_page):
+    start = (page - 1) * per_page
+    end = start + per_page
+
+    # slicing the query emits LIMIT/OFFSET, only the page is fetched
+    current_questions = questions.order_by(Question.id)[start:end]
+
+    # null columns are left out to keep the payload small
+    return [{key: value for key, value in question._asdict().items()
+             if value is not None} for question in current_questions]
 
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 3600,
+        'pool_pre_ping': True
+    }
     setup_db(app)
 
     '''
@@ -35,9 +155,7 @@ def create_app(test_config=None):
 
     @app.after_request
     def after_request(response):
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,true')
-        response.headers.add('Access-Control-Allow-Credentials', 'true')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PATCH,POST,DELETE,OPTIONS')
+        response.headers.extend(CORS_HEADERS)
         return response
 
     '''
@@ -49,16 +167,20 @@ def create_app(test_config=None):
     @app.route('/categories')
     def get_all_categories():
         try:
-            categories = Category.query.all()
-
-            categories_obj = {}
-            for category in categories:
-                categories_obj[category.id] = category.type
-
-            return jsonify({
-                'success': True,
-                'categories': categories_obj
-            }), 200
+            categories_obj = _get_categories_cached()
+            etag = _get_categories_etag()
+
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = json_response({
+                    'success': True,
+                    'categories': categories_obj
+                }, 200)
+
+            response.set_etag(etag)
+            response.cache_control.max_age = CATEGORIES_CACHE_TTL
+            return response
         except:
             abort(500)
 
@@ -77,28 +199,26 @@ def create_app(test_config=None):
 
     @app.route('/questions')
     def get_questions():
+        page = max(1, request.args.get('page', 1, type=int))
 
-        questions = Question.query.order_by(Question.id).all()
-        total_questions = len(questions)
-        categories = Category.query.order_by(Category.id).all()
+        questions = db.session.query(*QUESTION_COLUMNS)
+        total_questions = _get_question_count_cached()
 
         current_questions = get_paginated_questions(
-            request, questions,
-            QUESTIONS_PER_PAGE)
+            questions, page, QUESTIONS_PER_PAGE)
 
         if len(current_questions) == 0:
             abort(404)
 
-        categories_dict = {}
-        for category in categories:
-            categories_dict[category.id] = category.type
+        # [id, type] pairs in id order, shorter than the /categories object
+        categories = list(_get_categories_cached().items())
 
-        return jsonify({
+        return json_response({
             'success': True,
             'total_questions': total_questions,
-            'categories': categories_dict,
+            'categories': categories,
             'questions': current_questions
-        }), 200
+        }, 200)
 
     '''
     @DONE: 
@@ -111,17 +231,25 @@ def create_app(test_config=None):
     @app.route('/questions/<int:id>', methods=['DELETE'])
     def delete_question(id):
         try:
-            question = Question.query.get(id)
-            question.delete()
+            deleted = Question.query.filter_by(id=id).delete(
+                synchronize_session=False)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(422)
 
-            return jsonify({
-                'success': True,
-                'question_id': id,
-                'message': "Question successfully deleted"
-            }), 200
-        except:
+        if deleted == 0:
             abort(404)
 
+        _clear_question_count_cache()
+        _clear_quiz_ids_cache()
+
+        return json_response({
+            'success': True,
+            'question_id': id,
+            'message': "Question successfully deleted"
+        }, 200)
+
     '''
     @DONE: 
     Create an endpoint to POST a new question, 
@@ -146,24 +274,34 @@ def create_app(test_config=None):
                 or (difficulty == '') or (category == '')):
             abort(422)
 
-        try:
-            question = Question(
-                question=question,
-                answer=answer,
-                difficulty=difficulty,
-                category=category)
+        difficulty = parse_int(difficulty)
+        category = parse_int(category)
 
-            question.insert()
+        if ((difficulty is None) or (not 1 <= difficulty <= 5)
+                or (category not in _get_categories_cached())):
+            abort(422)
 
-            return jsonify({
-                'success': True,
-                'question_id': question.id,
-                'message': 'Question successfully created!'
-            }), 200
+        question = Question(
+            question=question,
+            answer=answer,
+            difficulty=difficulty,
+            category=category)
 
-        except:
+        try:
+            question.insert()
+        except SQLAlchemyError:
+            db.session.rollback()
             abort(422)
 
+        _clear_question_count_cache()
+        _clear_quiz_ids_cache()
+
+        return json_response({
+            'success': True,
+            'question_id': question.id,
+            'message': 'Question successfully created!'
+        }, 200)
+
     '''
     @DONE: 
     Create a POST endpoint to get questions based on a search term. 
@@ -178,23 +316,35 @@ def create_app(test_config=None):
     @app.route('/questions/search', methods=['POST'])
     def search_questions():
         search_term = request.get_json().get('searchTerm', '')
+        page = max(1, request.args.get('page', 1, type=int))
 
         try:
-            questions = Question.query.filter(
-                Question.question.ilike(f'%{search_term}%')).all()
-
-            if len(questions) == 0:
-                abort(404)
+            # must match the ix_questions_question_fts expression
+            question_vector = func.to_tsvector('english', Question.question)
+            search_query = func.plainto_tsquery('english', search_term)
+            questions = db.session.query(*QUESTION_COLUMNS).filter(
+                question_vector.op('@@')(search_query))
+
+            if db.session.query(questions.exists()).scalar():
+                questions = questions.order_by(
+                    func.ts_rank_cd(question_vector, search_query).desc())
+            else:
+                # stop words and partial words never match the tsquery,
+                # fall back to the trigram indexed substring search
+                questions = db.session.query(*QUESTION_COLUMNS).filter(
+                    Question.question.ilike(f'%{search_term}%'))
 
             paginated_questions = get_paginated_questions(
-                request, questions,
-                QUESTIONS_PER_PAGE)
+                questions, page, QUESTIONS_PER_PAGE)
+
+            if len(paginated_questions) == 0:
+                abort(404)
 
-            return jsonify({
+            return json_response({
                 'success': True,
                 'questions': paginated_questions,
-                'total_questions': len(Question.query.all())
-            }), 200
+                'total_questions': _get_question_count_cached()
+            }, 200)
 
         except:
             abort(404)
@@ -210,26 +360,27 @@ def create_app(test_config=None):
 
     @app.route('/categories/<int:id>/questions')
     def get_questions_by_category(id):
-        category = Category.query.filter_by(id=id).one_or_none()
+        page = max(1, request.args.get('page', 1, type=int))
+        categories = _get_categories_cached()
 
-        if category is None:
+        if id not in categories:
             abort(422)
 
-        questions = Question.query.filter_by(category=id).all()
+        questions = db.session.query(*QUESTION_COLUMNS).filter(
+            Question.category == id)
 
         paginated_questions = get_paginated_questions(
-            request, questions,
-            QUESTIONS_PER_PAGE)
+            questions, page, QUESTIONS_PER_PAGE)
 
         if len(paginated_questions) == 0:
             abort(404)
 
-        return jsonify({
+        return json_response({
             'success': True,
             'questions': paginated_questions,
-            'total_questions': len(questions),
-            'current_category': category.type
-        }), 200
+            'total_questions': _get_question_count_cached(id),
+            'current_category': categories[id]
+        }, 200)
 
     '''
     @DONE: 
@@ -253,15 +404,28 @@ def create_app(test_config=None):
             if (quiz_category is None) or (previous_questions is None):
                 abort(400)
 
-            questions = Question.query
+            category = int(quiz_category['id'])
+
+            # only known categories get an id list cached
+            if category != 0 and category not in _get_categories_cached():
+                abort(422)
 
-            if quiz_category['id'] != 0:
-                questions = questions.filter_by(
-                    category=quiz_category['id'])
+            previous_questions = set(previous_questions)
+            candidates = [
+                question_id for question_id in _get_quiz_ids_cached(category)
+                if question_id not in previous_questions]
 
-            questions = questions.filter(not_(Question.id.in_(previous_questions)))
+            question = None
+            while question is None and candidates:
+                question_id = random.choice(candidates)
+                question = Question.query.get(question_id)
 
-            question = questions.order_by(func.random()).first()
+                if question is None:
+                    # deleted since the id list was cached, try another one
+                    candidates.remove(question_id)
+
+            if question is None:
+                abort(404)
 
             question_dict = {
                 'id': question.id,
@@ -271,13 +435,11 @@ def create_app(test_config=None):
                 'difficulty': question.difficulty
             }
 
-            total_questions = len(questions.all())
-
-            return jsonify({
+            return json_response({
                 'success': True,
                 'question': question_dict,
-                'totalQuestions': total_questions
-            }), 200
+                'totalQuestions': len(candidates)
+            }, 200)
 
         except:
             abort(422)
@@ -290,37 +452,37 @@ def create_app(test_config=None):
 
     @app.errorhandler(400)
     def bad_request(error):
-        return jsonify({
+        return json_response({
             'success': False,
             ' ': 400,
             'message': 'Bad request error'
-        }), 400
+        }, 400)
 
     # Error handler for resource not found (404)
     @app.errorhandler(404)
     def not_found(error):
-        return jsonify({
+        return json_response({
             'success': False,
             'error': 404,
             'message': 'Resource not found'
-        }), 404
+        }, 404)
 
     # Error handler for internal server error (500)
     @app.errorhandler(500)
     def internal_server_error(error):
-        return jsonify({
+        return json_response({
             'success': False,
             'error': 500,
             'message': 'An error has occured, please try again'
-        }), 500
+        }, 500)
 
     # Error handler for unprocesable entity (422)
     @app.errorhandler(422)
     def unprocesable_entity(error):
-        return jsonify({
+        return json_response({
             'success': False,
             'error': 422,
             'message': 'Unprocessable entity'
-        }), 422
+        }, 422)
 
     return app
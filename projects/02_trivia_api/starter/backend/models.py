@@ -1,12 +1,14 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, DDL, Index, create_engine, event
 from flask_sqlalchemy import SQLAlchemy
 import json
 
 database_name = "trivia"
 database_path = "postgres://{}/{}".format('baraa:  @localhost:5432', database_name)
 
-db = SQLAlchemy()
+# the endpoints are read heavy and every write commits right away,
+# so skip autoflush checks and the post-commit reloads
+db = SQLAlchemy(session_options={'autoflush': False, 'expire_on_commit': False})
 
 '''
 setup_db(app)
@@ -30,6 +32,8 @@ Question
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    # serves the category filter and the id ordered pagination from one index
+    __table_args__ = (Index('ix_questions_category_id', 'category', 'id'),)
 
     id = Column(Integer, primary_key=True)
     question = Column(String)
@@ -64,6 +68,20 @@ class Question(db.Model):
         }
 
 
+'''
+ix_questions_question_trgm, ix_questions_question_fts
+    trigram and full text indexes backing the question search,
+    only created on PostgreSQL
+'''
+event.listen(
+    Question.__table__, 'after_create',
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm; "
+        "CREATE INDEX ix_questions_question_trgm ON questions "
+        "USING gin (question gin_trgm_ops); "
+        "CREATE INDEX ix_questions_question_fts ON questions "
+        "USING gin (to_tsvector('english', question))").execute_if(dialect='postgresql'))
+
+
 '''
 Category
 
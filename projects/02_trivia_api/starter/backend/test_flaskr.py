@@ -43,6 +43,16 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['categories'])
         self.assertEqual(len(data['categories']), 6)
 
+    def test_categories_not_modified(self):
+        response = self.client().get('/categories')
+        etag = response.headers['ETag']
+
+        response = self.client().get('/categories', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
     def test_questions_success(self):
         res = self.client().get('/questions?page=1')
         data = json.loads(res.data)
@@ -51,8 +61,26 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data["success"], True)
         self.assertTrue(data["total_questions"])
         self.assertTrue(len(data["categories"]))
+        self.assertEqual(data["categories"][0], [1, 'Science'])
         self.assertTrue(len(data["questions"]))
 
+    def test_questions_null_column_omitted(self):
+        with self.app.app_context():
+            question = Question(question='null difficulty question?',
+                                answer='test answer', category=1, difficulty=None)
+            question.insert()
+
+            post_data = {
+                'searchTerm': 'null difficulty question',
+            }
+            res = self.client().post('/questions/search', json=post_data)
+            data = json.loads(res.data)
+            question.delete()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["questions"][0]["answer"], 'test answer')
+        self.assertNotIn('difficulty', data["questions"][0])
+
     def test_questions_fail(self):
         res = self.client().get('/questions?page=100000')
         data = json.loads(res.data)
@@ -126,6 +154,35 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data["success"], False)
         self.assertEqual(data["message"], "Unprocessable entity")
 
+    def test_new_question_invalid_difficulty(self):
+        for difficulty in (7, 2.7, True, '2.7'):
+            post_data = {
+                'question': 'test question?',
+                'answer': 'test answer',
+                'difficulty': difficulty,
+                'category': 1
+            }
+            res = self.client().post('/questions', json=post_data)
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 422)
+            self.assertEqual(data["success"], False)
+            self.assertEqual(data["message"], "Unprocessable entity")
+
+    def test_new_question_unknown_category(self):
+        post_data = {
+            'question': 'test question?',
+            'answer': 'test answer',
+            'difficulty': 1,
+            'category': 1000
+        }
+        res = self.client().post('/questions', json=post_data)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data["success"], False)
+        self.assertEqual(data["message"], "Unprocessable entity")
+
     def test_question_by_category_success(self):
         res = self.client().get('/categories/1/questions?page=1')
         data = json.loads(res.data)
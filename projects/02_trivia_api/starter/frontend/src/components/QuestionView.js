@@ -29,7 +29,7 @@ class QuestionView extends Component {
         this.setState({
           questions: result.questions,
           totalQuestions: result.total_questions,
-          categories: result.categories,
+          categories: Object.fromEntries(result.categories),
           currentCategory: result.current_category })
         return;
       },